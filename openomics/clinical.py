@@ -91,16 +91,18 @@ class ClinicalData:
         return self.__class__.__name__
 
     def build_clinical_samples(self, all_samples, index="bcr_patient_barcode"):
-        """Build table with samples clinical data from patients :param
-        all_samples:
+        """Build table with samples clinical data from patients. The table is
+        indexed by the given sample barcodes, and each sample is joined to its
+        patient's clinical data by the TCGA patient barcode contained in the
+        sample barcode, e.g. "TCGA-05-4244" in "TCGA-05-4244-01A-01R-1107-07".
 
         Args:
-            all_samples:
-            index:
+            all_samples: The sample barcodes.
+            index: The column name of the patient barcodes.
         """
         self.samples = pd.DataFrame(index=all_samples)
-        self.samples.index.name = index
-        self.samples.index = self.samples.index.str[:-4]  # Cut sample barcode for TCGA
+        self.samples.index.name = "bcr_sample_barcode"
+        self.samples[index] = self.samples.index.str.extract(r"(TCGA-[^-]+-[^-]+)", expand=False)
 
         num_samples = self.samples.shape[0]
 
@@ -116,10 +118,16 @@ class ClinicalData:
         # self.samples.dropna(axis=0, subset=["bcr_patient_barcode"], inplace=True) # Remove samples without clinical data
 
         self.samples = self.samples[self.samples[PATHOLOGIC_STAGE_COL] != "[Discrepancy]"]
-        self.samples.loc[self.samples.index.str.contains(
-            "-11"), TUMOR_NORMAL_COL] = NORMAL  # Change stage label of normal samples to "Normal"
-        self.samples.loc[self.samples.index.str.contains(
-            "-01"), TUMOR_NORMAL_COL] = TUMOR  # Change stage label of normal samples to "Normal"
+        # Label samples by the sample type field of the barcode, e.g. "01" in "TCGA-05-4244-01A-01R-1107-07", where
+        # types 01-09 are tumor samples and 10-19 are normal samples
+        sample_type = pd.to_numeric(self.samples.index.str.extract(r"^TCGA-[^-]+-[^-]+-(\d{2})", expand=False))
+        self.samples.loc[(sample_type >= 10) & (sample_type <= 19), TUMOR_NORMAL_COL] = NORMAL
+        self.samples.loc[(sample_type >= 1) & (sample_type <= 9), TUMOR_NORMAL_COL] = TUMOR
+
+        # Low cardinality columns used to filter samples in MultiOmics.load_data()
+        for col in [PATHOLOGIC_STAGE_COL, HISTOLOGIC_SUBTYPE_COL, PREDICTED_SUBTYPE_COL, TUMOR_NORMAL_COL]:
+            if col in self.samples.columns:
+                self.samples[col] = self.samples[col].astype("category")
 
     def add_drug_response_data(self, file_path="nationwidechildrens.org_clinical_drug.txt",
                                patient_column="bcr_patient_barcode",
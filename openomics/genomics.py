@@ -4,7 +4,7 @@ from openomics.transcriptomics import Expression
 
 class SingleNucleotideVariants(Expression, Annotatable):
     def __init__(self, data, transpose, gene_index, usecols=None, gene_level=None, sample_level="sample_index",
-                 transform_fn=None, dropna=False, npartitions=None, cohort_name=None):
+                 transform_fn=None, dropna=False, npartitions=None, chunksize=None, cohort_name=None):
         """
         Args:
             data:
@@ -16,12 +16,14 @@ class SingleNucleotideVariants(Expression, Annotatable):
             transform_fn:
             dropna:
             npartitions:
+            chunksize:
             cohort_name:
         """
         super(SingleNucleotideVariants, self).__init__(data=data, transpose=transpose, gene_index=gene_index,
                                                        usecols=usecols, gene_level=gene_level,
                                                        sample_level=sample_level, transform_fn=transform_fn,
-                                                       dropna=dropna, npartitions=npartitions, cohort_name=cohort_name)
+                                                       dropna=dropna, npartitions=npartitions,
+                                                       chunksize=chunksize, cohort_name=cohort_name)
 
     @classmethod
     def name(cls):
@@ -30,7 +32,7 @@ class SingleNucleotideVariants(Expression, Annotatable):
 
 class SomaticMutation(Expression, Annotatable):
     def __init__(self, data, transpose, gene_index, usecols=None, gene_level=None, sample_level="sample_index",
-                 transform_fn=None, dropna=False, npartitions=None, cohort_name=None):
+                 transform_fn=None, dropna=False, npartitions=None, chunksize=None, cohort_name=None):
         """
         Args:
             data:
@@ -42,12 +44,13 @@ class SomaticMutation(Expression, Annotatable):
             transform_fn:
             dropna:
             npartitions:
+            chunksize:
             cohort_name:
         """
         super(SomaticMutation, self).__init__(data=data, transpose=transpose, gene_index=gene_index, usecols=usecols,
                                               gene_level=gene_level, sample_level=sample_level,
                                               transform_fn=transform_fn, dropna=dropna, npartitions=npartitions,
-                                              cohort_name=cohort_name)
+                                              chunksize=chunksize, cohort_name=cohort_name)
 
     @classmethod
     def name(cls):
@@ -56,7 +59,7 @@ class SomaticMutation(Expression, Annotatable):
 
 class DNAMethylation(Expression, Annotatable):
     def __init__(self, data, transpose, gene_index, usecols=None, gene_level=None, sample_level="sample_index",
-                 transform_fn=None, dropna=False, npartitions=None, cohort_name=None):
+                 transform_fn=None, dropna=False, npartitions=None, chunksize=None, cohort_name=None):
         """
         Args:
             data:
@@ -68,12 +71,13 @@ class DNAMethylation(Expression, Annotatable):
             transform_fn:
             dropna:
             npartitions:
+            chunksize:
             cohort_name:
         """
         super(DNAMethylation, self).__init__(data=data, transpose=transpose, gene_index=gene_index, usecols=usecols,
                                              gene_level=gene_level, sample_level=sample_level,
                                              transform_fn=transform_fn, dropna=dropna, npartitions=npartitions,
-                                             cohort_name=cohort_name)
+                                             chunksize=chunksize, cohort_name=cohort_name)
 
     @classmethod
     def name(cls):
@@ -82,7 +86,7 @@ class DNAMethylation(Expression, Annotatable):
 
 class CopyNumberVariation(Expression, Annotatable):
     def __init__(self, data, transpose, gene_index, usecols=None, gene_level=None, sample_level="sample_index",
-                 transform_fn=None, dropna=False, npartitions=None, cohort_name=None):
+                 transform_fn=None, dropna=False, npartitions=None, chunksize=None, cohort_name=None):
         """
         Args:
             data:
@@ -94,12 +98,13 @@ class CopyNumberVariation(Expression, Annotatable):
             transform_fn:
             dropna:
             npartitions:
+            chunksize:
             cohort_name:
         """
         super(CopyNumberVariation, self).__init__(data=data, transpose=transpose, gene_index=gene_index,
                                                   usecols=usecols, gene_level=gene_level, sample_level=sample_level,
                                                   transform_fn=transform_fn, dropna=dropna, npartitions=npartitions,
-                                                  cohort_name=cohort_name)
+                                                  chunksize=chunksize, cohort_name=cohort_name)
 
     @classmethod
     def name(cls):
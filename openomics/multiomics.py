@@ -1,6 +1,9 @@
+import functools
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Union
 
+import numpy as np
 import pandas as pd
 
 import openomics
@@ -11,10 +14,8 @@ from .clinical import (
     TUMOR_NORMAL_COL,
     PREDICTED_SUBTYPE_COL,
 )
-from .genomics import SomaticMutation, CopyNumberVariation, DNAMethylation
-from .imageomics import WholeSlideImage
-from .proteomics import Protein
-from .transcriptomics import MessengerRNA, MicroRNA, LncRNA, Expression
+from .transcriptomics import Expression
+from .utils.df import isin_codes
 
 
 class MultiOmics:
@@ -25,15 +26,39 @@ class MultiOmics:
         """
         Args:
             cohort_name (str): the clinical cohort name
-            omics_data:
+            omics_data (list): A list of Expression objects, or callables which
+                return an Expression object, e.g.
+                `functools.partial(MessengerRNA, data=..., transpose=True)`.
+                Callables are run concurrently in a thread pool, then the
+                omics are added in the given order.
         """
         self._cohort_name = cohort_name
-        self._omics = []
+        self._omics = {}
 
         # This is a data dictionary accessor to retrieve individual -omic data
         self.data = {}
 
+        # Genes to select at load_data(), set by set_gene_subset()
+        self.gene_subset = None
+
+        # Samples by omics table of the row position of each sample in each omic (-1 if missing), built at
+        # build_samples(). Its index is the codebook of sample barcodes, to avoid hashing them at each lookup.
+        self._sample_positions = None
+
+        # Memoized results of match_samples() and get_sample_attributes()
+        self._match_samples_cache = {}
+        self._sample_attributes_cache = {}
+
         if omics_data:
+            omics_data = list(omics_data)
+
+            # Load the omics table files in parallel
+            loaders = [i for i, omics in enumerate(omics_data) if callable(omics)]
+            if loaders:
+                with ThreadPoolExecutor(max_workers=min(8, len(loaders))) as executor:
+                    for i, omics in zip(loaders, executor.map(lambda i: omics_data[i](), loaders)):
+                        omics_data[i] = omics
+
             for omics in omics_data:
                 self.add_omic(omics)
 
@@ -51,11 +76,20 @@ class MultiOmics:
         """
         self.__dict__[omic_data.name()] = omic_data
 
-        if omic_data.name not in self._omics:
-            self._omics.append(omic_data.name())
+        self._omics[omic_data.name()] = omic_data
+
+        # Sort samples so that index intersections and lookups take the monotonic fast paths
+        if isinstance(omic_data.expressions, pd.DataFrame):
+            if not omic_data.expressions.index.is_monotonic_increasing:
+                omic_data.expressions = omic_data.expressions.sort_index()
+            if not omic_data.expressions.index.is_unique:
+                logging.warning("{} has duplicated samples in its index, which are only removed at load_data()".format(
+                    omic_data.name()))
 
         # dictionary as data accessor to the expression data
         self.data[omic_data.name()] = omic_data.expressions
+        self._sample_positions = None
+        self.clear_cache()
 
         # Initialize annotation
         if initialize_annotations:
@@ -89,7 +123,7 @@ class MultiOmics:
         self.build_samples(**kwargs)
 
     def get_omics_list(self):
-        return self._omics
+        return list(self._omics)
 
     def __getitem__(self, item:str):
         """This function allows the MultiOmicData class objects to access
@@ -98,31 +132,14 @@ class MultiOmics:
         Args:
             item (str): a string of the class name
         """
-        if item.lower() == MessengerRNA.name().lower():
-            return self.__getattribute__(MessengerRNA.name())
-
-        elif item.lower() == MicroRNA.name().lower():
-            return self.__getattribute__(MicroRNA.name())
-
-        elif item.lower() == LncRNA.name().lower():
-            return self.__getattribute__(LncRNA.name())
-
-        elif item.lower() == WholeSlideImage.name().lower():
-            return self.__getattribute__(WholeSlideImage.name())
-
-        elif item.lower() == SomaticMutation.name().lower():
-            return self.__getattribute__(SomaticMutation.name())
-
-        elif item.lower() == CopyNumberVariation.name().lower():
-            return self.__getattribute__(CopyNumberVariation.name())
-
-        elif item.lower() == DNAMethylation.name().lower():
-            return self.__getattribute__(DNAMethylation.name())
+        if item in self._omics:
+            return self._omics[item]
 
-        elif item.lower() == Protein.name().lower():
-            return self.__getattribute__(Protein.name())
+        for name, omic in self._omics.items():
+            if item.lower() == name.lower():
+                return omic
 
-        elif item.lower() == "patients":
+        if item.lower() == "patients":
             return self.clinical.patient
         elif item.lower() == "samples":
             if hasattr(self, "clinical"):
@@ -143,9 +160,9 @@ class MultiOmics:
         for omic_A in self._omics:
             for omic_B in self._omics:
                 if omic_A != omic_B:
-                    self.__getattribute__(omic_A).drop_genes(
-                        set(self.__getattribute__(omic_A).get_genes_list())
-                        & set(self.__getattribute__(omic_B).get_genes_list()))
+                    self._omics[omic_A].drop_genes(
+                        set(self._omics[omic_A].get_genes_list())
+                        & set(self._omics[omic_B].get_genes_list()))
 
     def build_samples(self, agg_by="union"):
         """Running this function will build a dataframe for all samples across
@@ -154,6 +171,9 @@ class MultiOmics:
         Args:
             agg_by (str): ["union", "intersection"]
         """
+        self.clear_cache()
+        self._sample_positions = None
+
         # make sure at least one ExpressionData present
         if len(self._omics) < 1:
             logging.debug(
@@ -161,19 +181,52 @@ class MultiOmics:
             )
             return
 
-        all_samples = pd.Index([])
-        for omic in self._omics:
-            if agg_by == "union":
-                all_samples = all_samples.union(self.data[omic].index)
-            elif agg_by == "intersection":
-                all_samples = all_samples.intersection(self.data[omic].index)
+        if agg_by == "union":
+            all_samples = pd.Index(pd.unique(np.concatenate([self.data[omic].index.values
+                                                             for omic in self._omics]))).sort_values()
+
+            if all(isinstance(self.data[omic], pd.DataFrame) and self.data[omic].index.is_unique
+                   for omic in self._omics):
+                self._sample_positions = pd.DataFrame({omic: self.data[omic].index.get_indexer(all_samples)
+                                                       for omic in self._omics}, index=all_samples)
+        elif agg_by == "intersection":
+            all_samples = self.match_samples(self.get_omics_list())
+        else:
+            raise ValueError("agg_by must be one of ['union', 'intersection']")
 
         if hasattr(self, "clinical"):
             self.clinical.build_clinical_samples(all_samples)
+            self.data["SAMPLES"] = self.clinical.samples
             self.samples = self.clinical.samples.index
         else:
             self.samples = all_samples
 
+    def clear_cache(self):
+        """Clear the memoized results of match_samples() and
+        get_sample_attributes(). This is called whenever omics or clinical data
+        are added or modified.
+        """
+        self._match_samples_cache.clear()
+        self._sample_attributes_cache.clear()
+
+    def set_gene_subset(self, genes):
+        """Only select the given genes/transcripts/proteins from each omic's
+        expression DataFrame when calling load_data(). Genes not present in an
+        omic are ignored.
+
+        This is a load-time filter on the expressions already in memory, and
+        does not prune what is read from file. For a table with gene columns
+        (transpose=False), the omic's `usecols` can be given the gene names as
+        a list instead. Only reads of the table's Parquet sidecar are then
+        projected to these columns. The text table is always parsed whole, and
+        `usecols` is applied to it afterwards.
+
+        Args:
+            genes (list): A list of gene names or IDs matching the omics'
+                gene index. If None, then selects all genes.
+        """
+        self.gene_subset = pd.Index(genes) if genes is not None else None
+
     def __dir__(self):
         return list(self.data.keys())
 
@@ -187,12 +240,30 @@ class MultiOmics:
         Returns:
             matched_sapmles: An pandas Index list
         """
-        # TODO check that for single modalities, this fetch all patients
-        matched_samples = self.data[omics[0]].index.copy()
+        key = tuple(sorted(omics))
+        if key in self._match_samples_cache:
+            return self._match_samples_cache[key]
+
+        indices = [self.data[omic].index for omic in omics]
+
+        if self._sample_positions is not None:
+            # Select the samples present in all omics from the precomputed positions table
+            present = (self._sample_positions[list(omics)].values >= 0).all(axis=1)
+            matched_samples = self._sample_positions.index[present]
+        elif all(isinstance(self.data[omic], pd.DataFrame) for omic in omics) and \
+                all(index.is_monotonic_increasing and index.is_unique for index in indices):
+            # Sorted unique indexes are intersected with a linear merge, without hashing
+            matched_samples = functools.reduce(lambda a, b: a.intersection(b, sort=None), indices)
+        else:
+            # Otherwise, probe the smallest index for membership in every other index
+            base = min(indices, key=len)
+            mask = np.ones(len(base), dtype=bool)
+            for index in indices:
+                if index is not base:
+                    mask &= base.isin(index)
+            matched_samples = base[mask]
 
-        for omic in omics:
-            matched_samples = matched_samples.join(self.data[omic].index,
-                                                   how="inner")
+        self._match_samples_cache[key] = matched_samples
 
         return matched_samples
 
@@ -232,45 +303,94 @@ class MultiOmics:
             samples, and y contain the :param target: labels for those samples.
         """
         if omics == "all" or omics is None:
-            omics = self._omics
+            omics = self.get_omics_list()
 
         matched_samples = self.match_samples(omics)
 
         if samples_barcode is not None:
-            matched_samples = samples_barcode
+            matched_samples = pd.Index(samples_barcode)
 
         if hasattr(self, "clinical") and isinstance(self.clinical,
                                                     ClinicalData):
             # Build targets clinical data
-            y = self.get_sample_attributes(matched_samples)
-
-            # Select only samples with certain cancer stage or subtype
-            if pathologic_stages:
-                y = y[y[PATHOLOGIC_STAGE_COL].isin(pathologic_stages)]
-            if histological_subtypes:
-                y = y[y[HISTOLOGIC_SUBTYPE_COL].isin(histological_subtypes)]
-            if predicted_subtypes:
-                y = y[y[PREDICTED_SUBTYPE_COL].isin(predicted_subtypes)]
-            if tumor_normal:
-                y = y[y[TUMOR_NORMAL_COL].isin(tumor_normal)]
-
-            # Filter y target column labels
-            y = y.filter(target)
-            y.dropna(axis=0, inplace=True)
+            y = self._get_sample_attributes(matched_samples)
+            target = [col for col in target if col in y.columns]
+
+            # Select only samples with certain cancer stage or subtype, and without missing target labels,
+            # with a single combined boolean mask
+            masks = [y[target].notna().all(axis=1).values]
+            masks.extend(isin_codes(y[col], values) for col, values in [(PATHOLOGIC_STAGE_COL, pathologic_stages),
+                                                                        (HISTOLOGIC_SUBTYPE_COL, histological_subtypes),
+                                                                        (PREDICTED_SUBTYPE_COL, predicted_subtypes),
+                                                                        (TUMOR_NORMAL_COL, tumor_normal)] if values)
+            y = y.loc[np.logical_and.reduce(masks), target]
             matched_samples = y.index
         else:
             y = None
 
         # Build expression matrix for each omic, indexed by matched_samples
+        rows = self._sample_positions.index.get_indexer(matched_samples) \
+            if self._sample_positions is not None else None
+        positions = {omic: self.get_sample_positions(omic, matched_samples, rows=rows) for omic in omics
+                     if isinstance(self.data[omic], pd.DataFrame) and self.data[omic].index.is_unique}
+
         X_multiomics = {}
         for omic in omics:
-            X_multiomics[omic] = self.data[omic].loc[matched_samples, self[omic].get_genes_list()]
+            genes = self[omic].get_genes_list()
+            if self.gene_subset is not None:
+                genes = genes[genes.isin(self.gene_subset)]
+
+            if omic not in positions:
+                X_multiomics[omic] = self.data[omic].loc[matched_samples]
+            elif positions[omic] is None:
+                # All rows in order. Return a copy, unless the columns selection below makes a new frame anyway, so
+                # that callers' inplace edits never modify self.data
+                X_multiomics[omic] = self.data[omic] if not self.data[omic].columns.equals(genes) \
+                    else self.data[omic].copy()
+            else:
+                X_multiomics[omic] = self.data[omic].take(positions[omic], axis=0)
+
+            if not X_multiomics[omic].columns.equals(genes):
+                X_multiomics[omic] = X_multiomics[omic].loc[:, genes]
 
             if remove_duplicates:
                 X_multiomics[omic] = X_multiomics[omic].loc[~X_multiomics[omic].index.duplicated(keep="first")]
 
         return X_multiomics, y
 
+    def get_sample_positions(self, omic, samples, rows=None):
+        """Fetch the row positions of the given samples in an omic's expression
+        DataFrame, to gather its rows with `DataFrame.take()` instead of a
+        label-based `.loc` lookup.
+
+        Args:
+            omic (str): The omic name in self.data
+            samples (pd.Index): The sample barcodes to select.
+            rows (np.ndarray): default None. The positions of `samples` in the
+                samples codebook built at build_samples(). If given, the omic's
+                row positions are read from the codebook's positions table
+                instead of hashing the sample barcodes again.
+
+        Returns:
+            np.ndarray: An integer array of row positions, or None if the
+            omic's samples index already equals `samples`. The omic's samples
+            index must be unique.
+        """
+        index = self.data[omic].index
+        if index.equals(samples):
+            return None
+
+        if rows is not None and (rows >= 0).all():
+            indexer = self._sample_positions[omic].values[rows]
+        else:
+            indexer = index.get_indexer(samples)
+
+        if (indexer < 0).any():
+            raise KeyError("{} samples not found in {}: {}".format(
+                (indexer < 0).sum(), omic, list(samples[indexer < 0][:5])))
+
+        return indexer
+
     def get_sample_attributes(self, matched_samples):
         """Fetch patient's clinical data for each given samples barcodes in the
         matched_samples
@@ -281,7 +401,26 @@ class MultiOmics:
         Args:
             matched_samples: A list of sample barcodes
         """
-        return self.data["SAMPLES"].reindex(matched_samples)
+        return self._get_sample_attributes(matched_samples).copy()
+
+    def _get_sample_attributes(self, matched_samples):
+        """Same as get_sample_attributes(), but returns the memoized DataFrame
+        itself, which must not be modified.
+
+        Args:
+            matched_samples: A list of sample barcodes
+        """
+        # Index objects are unhashable, so memoize by identity, and only for the indexes returned by match_samples()
+        # which are held in its own cache. This bounds the cache to one entry per match_samples() result.
+        cached = self._sample_attributes_cache.get(id(matched_samples))
+        if cached is not None and cached[0] is matched_samples:
+            return cached[1]
+
+        sample_attributes = self.data["SAMPLES"].reindex(matched_samples)
+        if any(matched_samples is index for index in self._match_samples_cache.values()):
+            self._sample_attributes_cache[id(matched_samples)] = (matched_samples, sample_attributes)
+
+        return sample_attributes
 
     def print_sample_sizes(self):
         for omic in self.data:
@@ -306,6 +445,13 @@ class MultiOmics:
         Args:
             dictionary: A dictionary mapping patient's index to a subtype
         """
-        self.data["PATIENTS"] = self.data["PATIENTS"].assign(
-            subtypes=self.data["PATIENTS"][
-                self.clinical.patient_column].map(dictionary))
+        patients = self.data["PATIENTS"]
+        if self.clinical.patient_column in patients.columns:
+            barcodes = patients[self.clinical.patient_column].values
+        else:
+            barcodes = patients.index.values
+
+        # Align the subtypes to the patients with a single reindex, then consolidate the DataFrame's blocks
+        self.data["PATIENTS"] = patients.assign(
+            subtypes=pd.Series(dictionary).reindex(barcodes).values).copy()
+        self.clear_cache()
@@ -7,7 +7,7 @@ from .transcriptomics import Expression
 
 class Protein(Expression, Annotatable):
     def __init__(self, data, transpose, gene_index=None, usecols=None, gene_level=None, sample_level="sample_index",
-                 transform_fn=None, dropna=False, npartitions=None, cohort_name=None):
+                 transform_fn=None, dropna=False, npartitions=None, chunksize=None, cohort_name=None):
         """
         Args:
             data:
@@ -19,11 +19,13 @@ class Protein(Expression, Annotatable):
             transform_fn:
             dropna:
             npartitions:
+            chunksize:
             cohort_name:
         """
         super(Protein, self).__init__(data=data, transpose=transpose, gene_index=gene_index, usecols=usecols,
                                       gene_level=gene_level, sample_level=sample_level, transform_fn=transform_fn,
-                                      dropna=dropna, npartitions=npartitions, cohort_name=cohort_name)
+                                      dropna=dropna, npartitions=npartitions, chunksize=chunksize,
+                                      cohort_name=cohort_name)
 
     @classmethod
     def name(cls):
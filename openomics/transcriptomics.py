@@ -2,12 +2,14 @@ import io
 import logging
 import os
 import re
+import tempfile
 from glob import glob
 from typing import Union
 
 import dask.dataframe as dd
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import validators
 # from Bio.UniProt import GOA
 from dask import delayed
@@ -32,7 +34,7 @@ class Expression(object):
 
     """
     def __init__(self, data, transpose, gene_index=None, usecols=None, gene_level=None, sample_level="sample_index",
-                 transform_fn=None, dropna=False, npartitions=None, **kwargs):
+                 transform_fn=None, dropna=False, npartitions=None, chunksize=None, **kwargs):
         """This constructor will create a DataFrame
         from file with the user-specified columns and genes column name, then
         tranpose it such that the rows are samples and columns are
@@ -67,13 +69,16 @@ class Expression(object):
             npartitions (int): [0-n], default 0 If 0, then uses a Pandas
                 DataFrame, if >1, then creates an off-memory Dask DataFrame with
                 n partitions
+            chunksize (int): default None. If given, reads the table file in
+                chunks of this many rows, and downcasts the float columns of
+                each chunk to float32 to lower the peak memory usage.
             **kwargs: Any arguments to pass into pd.read_table(**kwargs)
         """
         self.gene_level = gene_level
         self.sample_level = sample_level
 
         df = self.load_dataframe(data, transpose=transpose, usecols=usecols, gene_index=gene_index, dropna=dropna,
-                                 **kwargs)
+                                 chunksize=chunksize, **kwargs)
 
         self.expressions = self.preprocess_table(
             df,
@@ -99,6 +104,11 @@ class Expression(object):
             self.expressions = self.expressions.applymap(
                 lambda x: np.log2(x + 1))
 
+        # Store float expression values as a single float32 block, which halves the memory and bandwidth of any
+        # downstream computation
+        if len(self.expressions.columns) and (self.expressions.dtypes == np.float64).all():
+            self.expressions = self.expressions.astype(np.float32)
+
     @property
     def gene_index(self):
         return self.expressions.columns.name
@@ -108,7 +118,8 @@ class Expression(object):
                        transpose: bool,
                        usecols: str,
                        gene_index: str,
-                       dropna: bool, **kwargs):
+                       dropna: bool,
+                       chunksize: int = None, **kwargs):
         """Reading table data inputs to create a DataFrame.
 
         Args:
@@ -119,6 +130,8 @@ class Expression(object):
             usecols (str): A regex string to select columns. Default None.
             gene_index (str): The column name what contains the gene names or IDs.
             dropna (bool): Whether to drop rows with null values
+            chunksize (int): default None. If given, reads a table file in
+                chunks of this many rows.
 
         Returns:
             Union[pd.DataFrame, dd.DataFrame]: The loaded dataframe.
@@ -143,7 +156,8 @@ class Expression(object):
             df = pd.read_table(file, **kwargs)
 
         elif isinstance(data, str) and os.path.isfile(data):
-            df = pd.read_table(data, sep=None, engine="python")
+            df = _cached_read(data, reader=pd.read_table, columns=_usecols_filter(usecols, gene_index),
+                              chunksize=chunksize, sep=None, engine="python")
 
 
         else:
@@ -181,7 +195,7 @@ class Expression(object):
         """
         # Filter columns
         if usecols is not None and isinstance(usecols, str):
-            if gene_index not in usecols:
+            if gene_index is not None and gene_index not in usecols:
                 # include index column in the filter regex query
                 usecols = (usecols + "|" + gene_index)
 
@@ -193,9 +207,10 @@ class Expression(object):
                 df = df[columns]
 
         elif usecols is not None and isinstance(usecols, list):
-            if gene_index not in usecols:
-                usecols.append(gene_index)
-            df =  df[usecols]
+            if gene_index is not None and gene_index not in usecols:
+                usecols = usecols + [gene_index]
+            # Columns missing from the table are ignored, as when they're skipped while reading from file
+            df = df[[col for col in usecols if col in df.columns]]
 
         # Drop duplicate column names
         df = drop_duplicate_columns(df)
@@ -328,6 +343,97 @@ class Expression(object):
     features = property(get_genes_list)
 
 
+def _usecols_filter(usecols, gene_index):
+    """Build a column name predicate equivalent to the `usecols` selection done
+    in :meth:`Expression.preprocess_table`, so that unused columns can be
+    skipped while reading from file.
+
+    Args:
+        usecols (str, list): A regex string or a list of column names.
+        gene_index (str): The gene column name, which is always selected.
+    """
+    if isinstance(usecols, str):
+        regex = re.compile(usecols if gene_index is None else usecols + "|" + gene_index)
+        return lambda col: regex.search(col) is not None
+    elif isinstance(usecols, list):
+        return lambda col: col in usecols or col == gene_index
+    else:
+        return None
+
+
+def _downcast_floats(df: pd.DataFrame):
+    """Convert the float64 columns of a DataFrame to float32.
+
+    Args:
+        df (pd.DataFrame):
+    """
+    cols = df.columns[df.dtypes.eq(np.float64)]
+    if len(cols):
+        df[cols] = df[cols].astype(np.float32)
+    return df
+
+
+def _cached_read(path, reader=pd.read_table, columns=None, chunksize=None, **kwargs):
+    """Read a table file through a Parquet sidecar file saved next to it at
+    `path + ".parquet"`. On the first read, the text file is parsed with
+    `reader` and the sidecar is written. Subsequent reads load the sidecar
+    instead, as long as it is not older than the text file. If the sidecar
+    can't be read, the text file is parsed again and the sidecar rewritten.
+
+    Args:
+        path (str): Path to the text table file.
+        reader (callable): The pandas text reader, default pd.read_table.
+        columns (list, callable): default None. Either a list of column names
+            or a predicate on column names. If given, only these columns are
+            decoded from the Parquet sidecar.
+        chunksize (int): default None. If given, parses the text file in chunks
+            of this many rows, downcasting the float columns of each chunk to
+            float32 before concatenating them. The sidecar is not written from
+            such a read, but is still loaded if it already exists.
+        **kwargs: Any arguments to pass into reader(path, **kwargs)
+
+    Returns:
+        pd.DataFrame: The loaded dataframe.
+    """
+    parquet_path = path + ".parquet"
+
+    if os.path.isfile(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(path):
+        try:
+            if callable(columns):
+                names = [col for col in pq.read_schema(parquet_path).names if columns(col)]
+            else:
+                names = columns
+            # Convert each Arrow column to its own block and release the Arrow buffers as they are converted,
+            # instead of consolidating into a copy while the whole Arrow table is still held in memory
+            return pq.read_table(parquet_path, columns=names).to_pandas(split_blocks=True, self_destruct=True)
+        except Exception as e:
+            logging.warning("Could not read Parquet sidecar at {}, reading {} instead: {}".format(
+                parquet_path, path, e))
+
+    if chunksize:
+        # No sidecar is written from a downcast read, so that later reads without chunksize keep float64 values
+        return pd.concat([_downcast_floats(chunk) for chunk in reader(path, chunksize=chunksize, **kwargs)],
+                         copy=False)
+
+    df = reader(path, **kwargs)
+
+    # Write to a temporary file, then move it in place, so that an interrupted or concurrent write never leaves a
+    # truncated sidecar at parquet_path
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(parquet_path) + ".",
+                                        dir=os.path.dirname(parquet_path) or None)
+        os.close(fd)
+        df.to_parquet(tmp_path, engine="pyarrow", compression="snappy")
+        os.replace(tmp_path, parquet_path)
+    except Exception as e:
+        logging.info("Could not write Parquet sidecar at {}: {}".format(parquet_path, e))
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return df
+
+
 class LncRNA(Expression, Annotatable):
     def __init__(
         self,
@@ -340,6 +446,7 @@ class LncRNA(Expression, Annotatable):
         transform_fn=None,
         dropna=False,
         npartitions=None,
+        chunksize=None,
         cohort_name=None,
     ):
         """
@@ -353,11 +460,13 @@ class LncRNA(Expression, Annotatable):
             transform_fn:
             dropna:
             npartitions:
+            chunksize:
             cohort_name:
         """
         super(LncRNA, self).__init__(data=data, transpose=transpose, gene_index=gene_index, usecols=usecols,
                                      gene_level=gene_level, sample_level=sample_level, transform_fn=transform_fn,
-                                     dropna=dropna, npartitions=npartitions, cohort_name=cohort_name)
+                                     dropna=dropna, npartitions=npartitions, chunksize=chunksize,
+                                     cohort_name=cohort_name)
 
     @classmethod
     def name(cls):
@@ -376,11 +485,13 @@ class MessengerRNA(Expression, Annotatable):
         transform_fn=None,
         dropna=False,
         npartitions=None,
+        chunksize=None,
         cohort_name=None,
     ):
         super(MessengerRNA, self).__init__(data=data, transpose=transpose, gene_index=gene_index, usecols=usecols,
                                            gene_level=gene_level, sample_level=sample_level, transform_fn=transform_fn,
-                                           dropna=dropna, npartitions=npartitions, cohort_name=cohort_name)
+                                           dropna=dropna, npartitions=npartitions, chunksize=chunksize,
+                                           cohort_name=cohort_name)
 
     @classmethod
     def name(cls):
@@ -399,11 +510,13 @@ class MicroRNA(Expression, Annotatable):
         transform_fn=None,
         dropna=False,
         npartitions=None,
+        chunksize=None,
         cohort_name=None,
     ):
         super(MicroRNA, self).__init__(data=data, transpose=transpose, gene_index=gene_index, usecols=usecols,
                                        gene_level=gene_level, sample_level=sample_level, transform_fn=transform_fn,
-                                       dropna=dropna, npartitions=npartitions, cohort_name=cohort_name)
+                                       dropna=dropna, npartitions=npartitions, chunksize=chunksize,
+                                       cohort_name=cohort_name)
 
     @classmethod
     def name(cls):
@@ -25,6 +25,25 @@ def concat(series: pd.Series):
         return None
 
 
+def isin_codes(series: pd.Series, values):
+    """ Same as `series.isin(values).values`, but compares the integer codes of
+    a categorical Series instead of its values.
+    Args:
+        series (pd.Series):
+        values (list-like):
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.isin(values).values
+
+    values = pd.Index(list(values))
+    codes = series.cat.categories.get_indexer(values)
+    codes = codes[codes >= 0]
+    if values.hasnans:
+        # Missing values have the code -1
+        codes = np.append(codes, -1)
+    return np.isin(series.cat.codes.values, codes)
+
+
 def drop_duplicate_columns(df):
     """
     Args:
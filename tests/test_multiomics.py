@@ -1,19 +1,38 @@
 """Tests for `openomics` package."""
 
-import os, pytest
+import os, pytest, shutil
+import numpy as np
+import pandas as pd
+from functools import partial
 
 from openomics import MessengerRNA, MicroRNA, LncRNA, Protein, SomaticMutation
 from openomics import MultiOmics
+from openomics.utils.df import isin_codes
 
 from .test_clinical import generate_TCGA_clinical
 
 cohort_folder_path = "tests/data/TCGA_LUAD/"
 
 
+@pytest.fixture(scope="session")
+def cohort_folder(tmp_path_factory):
+    """Copy the expression tables into a temporary folder, so that their Parquet sidecars aren't written in tests/data
+    and each test session parses the text tables.
+
+    Args:
+        tmp_path_factory:
+    """
+    folder = tmp_path_factory.mktemp("TCGA_LUAD")
+    for file in ["LUAD__geneExp.txt", "LUAD__miRNAExp__RPM.txt", "TCGA-rnaexpr.tsv",
+                 "LUAD__somaticMutation_geneLevel.txt", "protein_RPPA.txt"]:
+        shutil.copy(os.path.join(cohort_folder_path, file), folder)
+    return str(folder)
+
+
 @pytest.fixture
-def generate_TCGA_LUAD_MessengerRNA():
+def generate_TCGA_LUAD_MessengerRNA(cohort_folder):
     data = MessengerRNA(
-        data=os.path.join(cohort_folder_path, "LUAD__geneExp.txt"),
+        data=os.path.join(cohort_folder, "LUAD__geneExp.txt"),
         transpose=True,
         usecols="GeneSymbol|TCGA",
         gene_index="GeneSymbol",
@@ -25,9 +44,9 @@ def generate_TCGA_LUAD_MessengerRNA():
 
 
 @pytest.fixture
-def generate_TCGA_LUAD_MessengerRNA_dask():
+def generate_TCGA_LUAD_MessengerRNA_dask(cohort_folder):
     data = MessengerRNA(
-        data=os.path.join(cohort_folder_path, "LUAD__geneExp.txt"),
+        data=os.path.join(cohort_folder, "LUAD__geneExp.txt"),
         transpose=True,
         usecols="GeneSymbol|TCGA",
         gene_index="GeneSymbol",
@@ -41,9 +60,9 @@ def generate_TCGA_LUAD_MessengerRNA_dask():
 
 
 @pytest.fixture
-def generate_TCGA_LUAD_MicroRNA():
+def generate_TCGA_LUAD_MicroRNA(cohort_folder):
     data = MicroRNA(
-        data=os.path.join(cohort_folder_path, "LUAD__miRNAExp__RPM.txt"),
+        data=os.path.join(cohort_folder, "LUAD__miRNAExp__RPM.txt"),
         transpose=True,
         usecols="GeneSymbol|TCGA",
         gene_index="GeneSymbol",
@@ -55,9 +74,9 @@ def generate_TCGA_LUAD_MicroRNA():
 
 
 @pytest.fixture
-def generate_TCGA_LUAD_LncRNA():
+def generate_TCGA_LUAD_LncRNA(cohort_folder):
     data = LncRNA(
-        data=os.path.join(cohort_folder_path, "TCGA-rnaexpr.tsv"),
+        data=os.path.join(cohort_folder, "TCGA-rnaexpr.tsv"),
         transpose=True,
         usecols="Gene_ID|TCGA",
         gene_index="Gene_ID",
@@ -69,9 +88,9 @@ def generate_TCGA_LUAD_LncRNA():
 
 
 @pytest.fixture
-def generate_TCGA_LUAD_SomaticMutation():
+def generate_TCGA_LUAD_SomaticMutation(cohort_folder):
     data = SomaticMutation(
-        data=os.path.join(cohort_folder_path,
+        data=os.path.join(cohort_folder,
                           "LUAD__somaticMutation_geneLevel.txt"),
         transpose=True,
         usecols="GeneSymbol|TCGA",
@@ -83,9 +102,9 @@ def generate_TCGA_LUAD_SomaticMutation():
 
 
 @pytest.fixture
-def generate_TCGA_LUAD_Protein():
+def generate_TCGA_LUAD_Protein(cohort_folder):
     data = Protein(
-        data=os.path.join(cohort_folder_path, "protein_RPPA.txt"),
+        data=os.path.join(cohort_folder, "protein_RPPA.txt"),
         transpose=True,
         usecols="GeneSymbol|TCGA",
         gene_index="GeneSymbol",
@@ -104,6 +123,106 @@ def test_import_MessengerRNA_Dask(generate_TCGA_LUAD_MessengerRNA_dask):
     assert generate_TCGA_LUAD_MessengerRNA_dask.expressions is not None
 
 
+def load_Protein(file_path, **kwargs):
+    """
+    Args:
+        file_path:
+        **kwargs:
+    """
+    return Protein(
+        data=str(file_path),
+        transpose=True,
+        usecols="GeneSymbol|TCGA",
+        gene_index="GeneSymbol",
+        gene_level="protein_name",
+        **kwargs
+    )
+
+
+def test_import_Protein_parquet_sidecar(tmp_path, monkeypatch):
+    """
+    Args:
+        tmp_path:
+        monkeypatch:
+    """
+    file_path = tmp_path / "protein_RPPA.txt"
+    file_path.write_bytes(open(os.path.join(cohort_folder_path, "protein_RPPA.txt"), "rb").read())
+    parquet_path = tmp_path / "protein_RPPA.txt.parquet"
+    assert not parquet_path.exists()
+
+    text_data = load_Protein(file_path)
+    assert parquet_path.exists()
+
+    # The second read must not parse the text file
+    def read_table(*args, **kwargs):
+        raise AssertionError("Read the text file instead of the Parquet sidecar")
+
+    monkeypatch.setattr(pd, "read_table", read_table)
+    parquet_data = load_Protein(file_path)
+
+    assert parquet_data.expressions.equals(text_data.expressions)
+
+
+def test_import_Protein_corrupt_parquet_sidecar(tmp_path):
+    """
+    Args:
+        tmp_path:
+    """
+    file_path = tmp_path / "protein_RPPA.txt"
+    file_path.write_bytes(open(os.path.join(cohort_folder_path, "protein_RPPA.txt"), "rb").read())
+    text_data = load_Protein(file_path)
+
+    # A truncated sidecar, newer than the text file
+    parquet_path = tmp_path / "protein_RPPA.txt.parquet"
+    parquet_path.write_bytes(parquet_path.read_bytes()[:100])
+
+    data = load_Protein(file_path)
+    assert data.expressions.equals(text_data.expressions)
+    assert load_Protein(file_path).expressions.equals(text_data.expressions)
+    assert not [path for path in os.listdir(tmp_path) if path.endswith(".tmp")]
+
+
+def test_import_Protein_chunksize(tmp_path, generate_TCGA_LUAD_Protein):
+    """
+    Args:
+        tmp_path:
+        generate_TCGA_LUAD_Protein:
+    """
+    file_path = tmp_path / "protein_RPPA.txt"
+    file_path.write_bytes(open(os.path.join(cohort_folder_path, "protein_RPPA.txt"), "rb").read())
+
+    data = Protein(
+        data=str(file_path),
+        transpose=True,
+        usecols="GeneSymbol|TCGA",
+        gene_index="GeneSymbol",
+        gene_level="protein_name",
+        chunksize=50,
+    )
+    expressions = generate_TCGA_LUAD_Protein.expressions
+    assert (data.expressions.dtypes == "float32").all()
+    assert np.allclose(data.expressions.loc[expressions.index, expressions.columns], expressions, equal_nan=True)
+
+
+def test_import_chunksize_no_sidecar(tmp_path):
+    """
+    Args:
+        tmp_path:
+    """
+    file_path = tmp_path / "samples_by_genes.txt"
+    pd.DataFrame({"sample": ["TCGA-05-4244-01A", "TCGA-05-4249-01A"], "x": [0.1, 0.2], "y": [1, 2]}) \
+        .to_csv(file_path, sep="\t", index=False)
+
+    data = MessengerRNA(data=str(file_path), transpose=False, gene_index="sample", gene_level="gene_name",
+                        chunksize=1)
+    assert data.expressions["x"].dtype == np.float32
+    assert not (tmp_path / "samples_by_genes.txt.parquet").exists()
+
+    # A later read without chunksize isn't downcast
+    data = MessengerRNA(data=str(file_path), transpose=False, gene_index="sample", gene_level="gene_name")
+    assert data.expressions["x"].dtype == np.float64
+
+
 def test_import_expression_table_size(generate_TCGA_LUAD_MessengerRNA, generate_TCGA_clinical):
     """
     Args:
@@ -155,3 +274,224 @@ def test_TCGA_LUAD_multiomics_transcriptomics(generate_TCGA_LUAD):
         LncRNA.name(),
         Protein.name(),
     ])
+
+
+def test_TCGA_LUAD_match_samples(generate_TCGA_LUAD):
+    """
+    Args:
+        generate_TCGA_LUAD:
+    """
+    omics = [MessengerRNA.name(), MicroRNA.name(), LncRNA.name()]
+    matched_samples = generate_TCGA_LUAD.match_samples(omics)
+
+    expected = generate_TCGA_LUAD.data[omics[0]].index
+    for omic in omics[1:]:
+        expected = expected.intersection(generate_TCGA_LUAD.data[omic].index)
+
+    assert set(matched_samples) == set(expected)
+
+
+def test_load_data_samples_barcode(generate_TCGA_LUAD_MessengerRNA):
+    """
+    Args:
+        generate_TCGA_LUAD_MessengerRNA:
+    """
+    luad_data = MultiOmics("LUAD")
+    luad_data.add_omic(generate_TCGA_LUAD_MessengerRNA)
+
+    samples_barcode = generate_TCGA_LUAD_MessengerRNA.expressions.index[::-3]
+    X, y = luad_data.load_data([MessengerRNA.name()], samples_barcode=samples_barcode)
+
+    assert y is None
+    assert X[MessengerRNA.name()].equals(generate_TCGA_LUAD_MessengerRNA.expressions.loc[samples_barcode])
+
+
+def test_TCGA_LUAD_match_samples_cache(generate_TCGA_LUAD):
+    """
+    Args:
+        generate_TCGA_LUAD:
+    """
+    matched_samples = generate_TCGA_LUAD.match_samples([MessengerRNA.name(), MicroRNA.name()])
+    assert generate_TCGA_LUAD.match_samples([MicroRNA.name(), MessengerRNA.name()]) is matched_samples
+
+    generate_TCGA_LUAD.clear_cache()
+    assert generate_TCGA_LUAD.match_samples([MessengerRNA.name(), MicroRNA.name()]) is not matched_samples
+
+
+def test_TCGA_LUAD_multiomics_parallel_load(cohort_folder):
+    """
+    Args:
+        cohort_folder:
+    """
+    luad_data = MultiOmics("LUAD", omics_data=[
+        partial(MicroRNA, data=os.path.join(cohort_folder, "LUAD__miRNAExp__RPM.txt"), transpose=True,
+                usecols="GeneSymbol|TCGA", gene_index="GeneSymbol", gene_level="gene_name"),
+        partial(Protein, data=os.path.join(cohort_folder, "protein_RPPA.txt"), transpose=True,
+                usecols="GeneSymbol|TCGA", gene_index="GeneSymbol", gene_level="protein_name"),
+    ])
+    assert luad_data.get_omics_list() == [MicroRNA.name(), Protein.name()]
+    assert isinstance(luad_data[MicroRNA.name()], MicroRNA)
+
+
+def test_TCGA_LUAD_build_samples(generate_TCGA_LUAD_MessengerRNA, generate_TCGA_LUAD_MicroRNA):
+    """
+    Args:
+        generate_TCGA_LUAD_MessengerRNA:
+        generate_TCGA_LUAD_MicroRNA:
+    """
+    luad_data = MultiOmics("LUAD", omics_data=[generate_TCGA_LUAD_MessengerRNA, generate_TCGA_LUAD_MicroRNA])
+    luad_data.build_samples(agg_by="union")
+
+    assert luad_data.samples.equals(generate_TCGA_LUAD_MessengerRNA.expressions.index.union(
+        generate_TCGA_LUAD_MicroRNA.expressions.index))
+
+
+def test_load_data_gene_subset(generate_TCGA_LUAD_MessengerRNA):
+    """
+    Args:
+        generate_TCGA_LUAD_MessengerRNA:
+    """
+    luad_data = MultiOmics("LUAD")
+    luad_data.add_omic(generate_TCGA_LUAD_MessengerRNA)
+
+    genes = generate_TCGA_LUAD_MessengerRNA.get_genes_list()[:10]
+    luad_data.set_gene_subset(list(genes) + ["NOT_A_GENE"])
+    X, y = luad_data.load_data([MessengerRNA.name()])
+
+    assert X[MessengerRNA.name()].columns.equals(genes)
+
+
+def test_load_data_returns_copies(generate_TCGA_LUAD_MessengerRNA):
+    """
+    Args:
+        generate_TCGA_LUAD_MessengerRNA:
+    """
+    luad_data = MultiOmics("LUAD")
+    luad_data.add_omic(generate_TCGA_LUAD_MessengerRNA)
+    expressions = luad_data.data[MessengerRNA.name()].copy()
+
+    X, y = luad_data.load_data([MessengerRNA.name()], remove_duplicates=False)
+    assert X[MessengerRNA.name()] is not luad_data.data[MessengerRNA.name()]
+    X[MessengerRNA.name()].fillna(0, inplace=True)
+    X[MessengerRNA.name()] -= 1
+    assert luad_data.data[MessengerRNA.name()].equals(expressions)
+
+
+def test_annotate_samples(generate_TCGA_clinical):
+    """
+    Args:
+        generate_TCGA_clinical:
+    """
+    luad_data = MultiOmics("LUAD")
+    luad_data.add_clinical_data(generate_TCGA_clinical)
+
+    patients = luad_data.data["PATIENTS"].index
+    luad_data.annotate_samples({patients[0]: "A", patients[2]: "B"})
+
+    subtypes = luad_data.data["PATIENTS"]["subtypes"]
+    assert subtypes.iloc[0] == "A" and subtypes.iloc[2] == "B"
+    assert subtypes.isna().sum() == len(patients) - 2
+
+
+def test_TCGA_LUAD_match_samples_presence(generate_TCGA_LUAD_MessengerRNA):
+    """
+    Args:
+        generate_TCGA_LUAD_MessengerRNA:
+    """
+    subset = MicroRNA(data=generate_TCGA_LUAD_MessengerRNA.expressions.iloc[::2, :10], transpose=False)
+    luad_data = MultiOmics("LUAD", omics_data=[generate_TCGA_LUAD_MessengerRNA, subset])
+    omics = luad_data.get_omics_list()
+    matched_samples = luad_data.match_samples(omics)
+    assert matched_samples.equals(subset.expressions.index)
+
+    luad_data.build_samples(agg_by="union")
+    assert luad_data.match_samples(omics).equals(matched_samples)
+
+    X, y = luad_data.load_data(omics)
+    assert X[MessengerRNA.name()].equals(generate_TCGA_LUAD_MessengerRNA.expressions.loc[matched_samples])
+    assert X[MicroRNA.name()].equals(subset.expressions)
+
+
+def test_load_data_clinical(generate_TCGA_LUAD_MessengerRNA, generate_TCGA_clinical):
+    """
+    Args:
+        generate_TCGA_LUAD_MessengerRNA:
+        generate_TCGA_clinical:
+    """
+    luad_data = MultiOmics("LUAD", omics_data=[generate_TCGA_LUAD_MessengerRNA])
+    luad_data.add_clinical_data(generate_TCGA_clinical)
+
+    X, y = luad_data.load_data([MessengerRNA.name()], target=["pathologic_stage"])
+    assert len(y) > 0 and y["pathologic_stage"].notna().all()
+    assert X[MessengerRNA.name()].index.equals(y.index)
+
+    # Only match_samples() results are memoized, and callers get their own copy
+    for _ in range(5):
+        luad_data.load_data([MessengerRNA.name()], samples_barcode=y.index[:10])
+    assert len(luad_data._sample_attributes_cache) == 1
+
+    matched_samples = luad_data.match_samples([MessengerRNA.name()])
+    luad_data.get_sample_attributes(matched_samples).drop(columns="pathologic_stage", inplace=True)
+    assert "pathologic_stage" in luad_data.get_sample_attributes(matched_samples).columns
+
+
+def test_load_data_clinical_filters(generate_TCGA_LUAD_MessengerRNA, generate_TCGA_clinical):
+    """
+    Args:
+        generate_TCGA_LUAD_MessengerRNA:
+        generate_TCGA_clinical:
+    """
+    luad_data = MultiOmics("LUAD", omics_data=[generate_TCGA_LUAD_MessengerRNA])
+    luad_data.add_clinical_data(generate_TCGA_clinical)
+
+    for tumor_normal, sample_types in [(["Tumor"], range(1, 10)), (["Normal"], range(10, 20))]:
+        filters = {"pathologic_stage": ["Stage I", "Stage III"],
+                   "histologic_subtype": ["Lung Adenocarcinoma Mixed Subtype",
+                                          "Lung Adenocarcinoma- Not Otherwise Specified (NOS)"],
+                   "tumor_normal": tumor_normal}
+        X, y = luad_data.load_data([MessengerRNA.name()], target=["pathologic_stage"],
+                                   pathologic_stages=filters["pathologic_stage"],
+                                   histological_subtypes=filters["histologic_subtype"],
+                                   tumor_normal=filters["tumor_normal"])
+
+        # Reference selection with plain Series.isin on the samples clinical data
+        samples = luad_data.data["SAMPLES"].reindex(luad_data.match_samples([MessengerRNA.name()]))
+        mask = samples["pathologic_stage"].notna()
+        for col, values in filters.items():
+            mask &= samples[col].astype(object).isin(values)
+        expected = samples.index[mask]
+
+        assert len(expected) > 0
+        assert y.index.equals(expected)
+        assert X[MessengerRNA.name()].index.equals(expected)
+        assert set(y["pathologic_stage"].unique()) <= set(filters["pathologic_stage"])
+        # The tumor/normal label follows the sample type field of the barcodes
+        assert y.index.str.split("-").str[3].str[:2].astype(int).isin(sample_types).all()
+
+
+def test_import_usecols_gene_list(tmp_path):
+    """
+    Args:
+        tmp_path:
+    """
+    file_path = tmp_path / "samples_by_genes.txt"
+    pd.DataFrame({"sample": ["TCGA-05-4244-01A", "TCGA-05-4249-01A"],
+                  "GENE1": [1.0, 2.0], "GENE2": [3.0, 4.0], "GENE3": [5.0, 6.0]}) \
+        .to_csv(file_path, sep="\t", index=False)
+
+    usecols = ["GENE1", "GENE3", "NOT_A_GENE"]
+    for _ in range(2):  # Read from the text table, then from its Parquet sidecar
+        data = MessengerRNA(data=str(file_path), transpose=False, usecols=usecols, gene_index="sample",
+                            gene_level="gene_name")
+        assert list(data.expressions.columns) == ["GENE1", "GENE3"]
+        assert list(data.expressions.index) == ["TCGA-05-4244-01A", "TCGA-05-4249-01A"]
+    assert usecols == ["GENE1", "GENE3", "NOT_A_GENE"]
+
+
+def test_isin_codes():
+    series = pd.Series(["Stage I", "Stage II", np.nan, "Stage I", "Stage IV"])
+    for values in [["Stage I"], ["Stage II", "Stage III"], [np.nan], ["Stage IV", np.nan], [],
+                   ("Stage I",), {"Stage I", "Stage II"}, ("Stage IV", np.nan), pd.Index(["Stage II"])]:
+        expected = series.isin(values).values
+        assert (isin_codes(series, values) == expected).all()
+        assert (isin_codes(series.astype("category"), values) == expected).all()